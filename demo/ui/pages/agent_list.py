@@ -68,7 +68,7 @@ def load_agent_info(e: me.ClickEvent):
   state = me.state(AgentState)
   try:
     state.error = None
-    agent_card_response = get_agent_card(state.agent_address)
+    agent_card_response = asyncio.run(get_agent_card(state.agent_address))
     state.agent_name = agent_card_response.name
     state.agent_description = agent_card_response.description
     state.agent_framework_type = agent_card_response.provider.organization if agent_card_response.provider else ''
@@ -1,12 +1,31 @@
 import mesop as me
 import asyncio
 import os # Import os for environment variable access
+from dotenv import load_dotenv
 
 from components.header import header
 from components.page_scaffold import page_scaffold
 from components.page_scaffold import page_frame
 from state.state import SettingsState, AppState
 
+# Load .env before reading: this module is imported ahead of main.py's
+# own load_dotenv() call, and the value cannot change during a render.
+load_dotenv()
+OPENAI_API_BASE_DISPLAY = os.getenv("OPENAI_API_BASE", "Not Set")
+
+# Static styles and options, built once instead of on every render cycle
+_HEADLINE_STYLE = me.Style(
+    margin=me.Margin(bottom=15),
+    font_family="Google Sans",
+)
+_API_KEY_INPUT_STYLE = me.Style(width="400px", margin=me.Margin(bottom=10))
+_API_BASE_INPUT_STYLE = me.Style(width="400px")
+_SELECT_STYLE = me.Style(width=500)
+_OUTPUT_TYPE_OPTIONS = [
+    me.SelectOption(label="Image", value="image/*"),
+    me.SelectOption(label="Text (Plain)", value="text/plain"),
+]
+
 
 def on_selection_change_output_types(e: me.SelectSelectionChangeEvent):
   s = me.state(SettingsState)
@@ -17,10 +36,7 @@ def settings_page_content():
     """Settings Page Content."""
     settings_state = me.state(SettingsState)
     app_state = me.state(AppState)
-    
-    # Read OpenAI Base URL from environment for display
-    openai_api_base = os.getenv("OPENAI_API_BASE", "Not Set")
-    
+
     with page_scaffold():  # pylint: disable=not-context-manager
         with page_frame():
             with header("Settings", "settings"): pass
@@ -43,12 +59,9 @@ def settings_page_content():
                     me.text(
                         "OpenAI Configuration",
                         type="headline-6",
-                        style=me.Style(
-                            margin=me.Margin(bottom=15),
-                            font_family="Google Sans",
-                        ),
+                        style=_HEADLINE_STYLE,
                     )
-                    
+
                     # Display OpenAI API Key (read-only)
                     me.input(
                         label="OpenAI API Key",
@@ -56,27 +69,24 @@ def settings_page_content():
                         type="password",
                         appearance="outline",
                         readonly=True,
-                        style=me.Style(width="400px", margin=me.Margin(bottom=10)),
+                        style=_API_KEY_INPUT_STYLE,
                     )
 
                     # Display OpenAI API Base URL (read-only)
                     me.input(
                         label="OpenAI API Base URL",
-                        value=openai_api_base,
+                        value=OPENAI_API_BASE_DISPLAY,
                         readonly=True,
                         appearance="outline",
-                        style=me.Style(width="400px"),
+                        style=_API_BASE_INPUT_STYLE,
                     )
-                
+
                 # Output Types Section
                 me.select(
                     label="Supported Output Types",
-                    options=[
-                        me.SelectOption(label="Image", value="image/*"),
-                        me.SelectOption(label="Text (Plain)", value="text/plain"),
-                    ],
+                    options=_OUTPUT_TYPE_OPTIONS,
                     on_selection_change=on_selection_change_output_types,
-                    style=me.Style(width=500),
+                    style=_SELECT_STYLE,
                     multiple=True,
                     appearance="outline",
                     value=settings_state.output_mime_types,
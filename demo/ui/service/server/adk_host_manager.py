@@ -391,8 +391,8 @@ class ADKHostManager(ApplicationManager):
         rval.append((message_id, ""))
     return rval
 
-  def register_agent(self, url):
-    agent_data = get_agent_card(url)
+  async def register_agent(self, url):
+    agent_data = await get_agent_card(url)
     if not agent_data.url:
       agent_data.url = url
     self._agents.append(agent_data)
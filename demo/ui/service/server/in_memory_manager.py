@@ -1,5 +1,6 @@
 import asyncio
-import datetime
+import time
+from collections import defaultdict, deque
 from typing import Tuple, Optional
 import uuid
 import os  # Import os
@@ -21,16 +22,26 @@ from common.types import (
 )
 from utils.agent_card import get_agent_card
 from service.server.application_manager import ApplicationManager
-from service.server import test_image
 
 # Import Langchain OpenAI
 from langchain_openai import ChatOpenAI
 # Import A2AClient
-from common.client import A2AClient, A2ACardResolver
+from common.client import A2AClient
 
-# Load environment variables
+# Load environment variables; the import cache makes this once per process
 load_dotenv()
 
+# Read once at import time instead of per manager construction
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
+LLM_MODEL = os.getenv("LLM_MODEL")
+
+# How long a generated fallback reply is reused before asking the LLM again
+_FALLBACK_TTL_SECONDS = 300.0
+
+# Bound on retained events; the UI only ever shows recent history
+_MAX_EVENTS = 10_000
+
 logger = logging.getLogger(__name__) # Get logger instance
 
 class InMemoryFakeAgentManager(ApplicationManager):
@@ -40,79 +51,92 @@ class InMemoryFakeAgentManager(ApplicationManager):
   the AgentServer. This acts as the service contract that the Mesop app
   uses to send messages to the agent and provide information for the frontend.
   """
-  _conversations: list[Conversation]
-  _messages: list[Message]
-  _tasks: list[Task]
-  _events: list[Event]
-  _pending_message_ids: list[str]
+  _conversations: dict[str, Conversation]
+  _messages_by_conv: dict[str, list[Message]]
+  _tasks: dict[str, Task]
+  _events: deque[Event]
+  _pending_message_ids: dict[str, None]
   _agents: list[AgentCard]
-  _llm: Optional[ChatOpenAI]
+  _llm_cached: Optional[ChatOpenAI]
 
   def __init__(self):
-    self._conversations = []
-    self._messages = []
-    self._tasks = []
-    self._events = []
-    self._pending_message_ids = []
+    # Keyed by id for O(1) lookup/update; dicts preserve insertion order
+    # so the list-returning properties keep their ordering semantics.
+    self._conversations = {}
+    self._messages_by_conv = defaultdict(list)
+    self._tasks = {}
+    self._events = deque(maxlen=_MAX_EVENTS)
+    # Ordered set of pending ids: dict keys preserve insertion order for
+    # the UI while giving O(1) removal on completion.
+    self._pending_message_ids = {}
     self._agents = []
     self._task_map = {}
-    self._llm = None
+    self._inflight: set[asyncio.Task] = set()
+    self._llm_cached = None
+    self._llm_init_tried = False
+    # (monotonic timestamp, text) of the last generated fallback reply.
+    # The fallback prompt is a constant, so concurrent fallbacks can share
+    # one completion instead of each issuing an HTTPS request.
+    self._fallback_cache: Optional[Tuple[float, str]] = None
 
-    # Initialize LLM if keys are present
+  @property
+  def _llm(self) -> Optional[ChatOpenAI]:
+    """Build the fallback LLM on first use so manager construction stays cheap."""
+    if self._llm_init_tried:
+      return self._llm_cached
+    self._llm_init_tried = True
     try:
-        openai_api_key = os.getenv("OPENAI_API_KEY")
-        openai_api_base = os.getenv("OPENAI_API_BASE")
-        llm_model = os.getenv("LLM_MODEL")
-
-        if not openai_api_key:
+        if not OPENAI_API_KEY:
             logger.warning("OPENAI_API_KEY not found for InMemoryFakeAgentManager LLM fallback.")
-        elif not openai_api_base:
+        elif not OPENAI_API_BASE:
              logger.warning("OPENAI_API_BASE not found for InMemoryFakeAgentManager LLM fallback.")
-        elif not llm_model:
+        elif not LLM_MODEL:
             logger.warning("LLM_MODEL not found for InMemoryFakeAgentManager LLM fallback.")
         else:
-            self._llm = ChatOpenAI(
-                model=llm_model,
-                api_key=openai_api_key,
-                base_url=openai_api_base
+            self._llm_cached = ChatOpenAI(
+                model=LLM_MODEL,
+                api_key=OPENAI_API_KEY,
+                base_url=OPENAI_API_BASE
             )
             logger.info("InMemoryFakeAgentManager initialized LLM successfully.")
     except Exception as e:
         logger.warning(f"Failed to initialize LLM for InMemoryFakeAgentManager: {e}")
+    return self._llm_cached
 
   def create_conversation(self) -> Conversation:
-    conversation_id = str(uuid.uuid4())
+    conversation_id = uuid.uuid4().hex
     c = Conversation(conversation_id=conversation_id, is_active=True)
-    self._conversations.append(c)
+    self._conversations[conversation_id] = c
     return c
 
   def sanitize_message(self, message: Message) -> Message:
     if not message.metadata:
       message.metadata = {}
-    message.metadata.update({'message_id': str(uuid.uuid4())})
+    message.metadata.update({'message_id': uuid.uuid4().hex})
     return message
 
   async def process_message(self, message: Message):
-    self._messages.append(message)
     message_id = message.metadata['message_id']
-    self._pending_message_ids.append(message_id)
+    self._pending_message_ids[message_id] = None
     conversation_id = (
         message.metadata['conversation_id']
         if 'conversation_id' in message.metadata
         else None
     )
     conversation = self.get_conversation(conversation_id)
+    if conversation_id:
+      self._messages_by_conv[conversation_id].append(message)
     if conversation:
       conversation.messages.append(message)
-    
+
     self._events.append(Event(
-        id=str(uuid.uuid4()),
+        id=uuid.uuid4().hex,
         actor="host",
         content=message,
-        timestamp=datetime.datetime.utcnow().timestamp(),
+        timestamp=time.time(),
     ))
     
-    task_id = str(uuid.uuid4())
+    task_id = uuid.uuid4().hex
     task = Task(
               id=task_id,
               sessionId=conversation_id,
@@ -125,6 +149,41 @@ class InMemoryFakeAgentManager(ApplicationManager):
     self.add_task(task)
     self._task_map[message_id] = task_id
 
+    # Dispatch the agent/LLM round-trip in the background so this handler
+    # returns immediately; the UI already polls get_pending_messages for
+    # completion, so concurrent users no longer serialize on the round-trip.
+    background = asyncio.create_task(self._run_task(task, message, conversation))
+    self._inflight.add(background)
+    background.add_done_callback(
+        lambda t, message_id=message_id: self._on_dispatch_done(t, message_id))
+
+  def _on_dispatch_done(self, background: asyncio.Task, message_id: str):
+    """Retrieve the outcome of a background dispatch.
+
+    An exception escaping _run_task would otherwise never be retrieved and
+    would leave the message id pending forever, so log it and clear the id
+    rather than letting the UI poll a permanently stuck message.
+    """
+    self._inflight.discard(background)
+    if background.cancelled():
+      self._pending_message_ids.pop(message_id, None)
+      return
+    exc = background.exception()
+    if exc is not None:
+      logger.error(
+          "Background dispatch for message %s failed: %s",
+          message_id, exc, exc_info=exc)
+      self._pending_message_ids.pop(message_id, None)
+
+  async def _run_task(
+      self,
+      task: Task,
+      message: Message,
+      conversation: Optional[Conversation],
+  ):
+    """Run the agent/LLM round-trip for a submitted task and record the response."""
+    task_id = task.id
+    conversation_id = task.sessionId
     response = None
     agent_used_name = "LLM Fallback" # For logging
 
@@ -132,13 +191,19 @@ class InMemoryFakeAgentManager(ApplicationManager):
     if not self._agents: 
         # --- LLM Fallback logic (No agents registered) ---
         agent_used_name = "LLM Fallback"
-        logger.info(f"No agents registered. Using LLM fallback for message: {message.parts[0].text if message.parts else '[no text part]'}")
-        if self._llm: 
+        logger.info("No agents registered. Using LLM fallback for message: %s",
+                    message.parts[0].text if message.parts else '[no text part]')
+        if (llm := self._llm) is not None:
             try:
-                prompt = "You are a helpful assistant managing an agent system. Politely inform the user that no agents are currently registered or available to handle their request."
-                llm_response = await self._llm.ainvoke(prompt)
-                response_text = llm_response.content
-                logger.info(f"LLM fallback response: {response_text}")
+                cached = self._fallback_cache
+                if cached and time.monotonic() - cached[0] < _FALLBACK_TTL_SECONDS:
+                    response_text = cached[1]
+                else:
+                    prompt = "You are a helpful assistant managing an agent system. Politely inform the user that no agents are currently registered or available to handle their request."
+                    llm_response = await llm.ainvoke(prompt)
+                    response_text = llm_response.content
+                    self._fallback_cache = (time.monotonic(), response_text)
+                logger.info("LLM fallback response: %s", response_text)
                 response = Message(role="agent", parts=[TextPart(text=response_text)])
                 task.status.state = TaskState.COMPLETED # LLM fallback is considered complete
             except Exception as e:
@@ -162,13 +227,16 @@ class InMemoryFakeAgentManager(ApplicationManager):
                  raise TypeError("Stored agent is not an AgentCard object")
                  
             client = A2AClient(agent_card=target_agent)
+            # Serialize the message once; the dump is reused by the payload
+            # and any logging below.
+            msg_dump = message.model_dump(exclude_none=True)
             payload = {
                 "id": task_id,
                 "sessionId": conversation_id,
-                "acceptedOutputModes": ["text", "text/plain"], 
-                "message": message.model_dump(exclude_none=True),
+                "acceptedOutputModes": ["text", "text/plain"],
+                "message": msg_dump,
             }
-            logger.info(f"Sending task to agent '{agent_used_name}': {payload}")
+            logger.info("Sending task to agent '%s': %s", agent_used_name, payload)
             task_response = await client.send_task(payload)
 
             if task_response.error:
@@ -203,24 +271,23 @@ class InMemoryFakeAgentManager(ApplicationManager):
                  # 2. If no history, check Artifacts (if not already found)
                  elif not response_found and task_result.artifacts:
                      logger.info(f"No response in history or status.message, checking ARTIFACTS for agent '{agent_used_name}'. TaskId: {task_id}")
-                     # Try to find the first TextPart in artifacts
-                     for artifact in task_result.artifacts:
-                         if artifact.parts:
-                             for part in artifact.parts:
-                                 if isinstance(part, TextPart):
-                                     response = Message(role="agent", parts=[part])
-                                     # Log snippet of the found text
-                                     log_text = part.text[:100] + '...' if len(part.text) > 100 else part.text
-                                     logger.info(f"Response found in ARTIFACTS for agent '{agent_used_name}'. TaskId: {task_id}. Content snippet: '{log_text}'")
-                                     task.status.state = TaskState.COMPLETED
-                                     task.artifacts = task_result.artifacts # Save all artifacts
-                                     response_found = True
-                                     break # Use the first text part found
-                         if response_found:
-                             break # Stop checking artifacts once found
-                     
+                     # Single generator traversal for the first TextPart
+                     first_text = next(
+                         (p for a in task_result.artifacts
+                          for p in (a.parts or ())
+                          if p.type == 'text'),
+                         None)
+                     if first_text is not None:
+                         response = Message(role="agent", parts=[first_text])
+                         # Log snippet of the found text
+                         log_text = first_text.text[:100] + '...' if len(first_text.text) > 100 else first_text.text
+                         logger.info(f"Response found in ARTIFACTS for agent '{agent_used_name}'. TaskId: {task_id}. Content snippet: '{log_text}'")
+                         task.status.state = TaskState.COMPLETED
+                         task.artifacts = task_result.artifacts # Save all artifacts
+                         response_found = True
+
                      if not response_found:
-                         logger.warning(f"Agent '{agent_used_name}' returned artifacts, but no displayable TextPart found. TaskId: {task_id}. Artifacts: {task_result.artifacts}")
+                         logger.warning("Agent '%s' returned artifacts, but no displayable TextPart found. TaskId: %s. Artifacts: %s", agent_used_name, task_id, task_result.artifacts)
                          response_text = "Agent returned data, but not in a displayable text format."
                          response = Message(role="agent", parts=[TextPart(text=response_text)])
                          task.status.state = TaskState.COMPLETED # Still completed, just not displayable
@@ -228,13 +295,13 @@ class InMemoryFakeAgentManager(ApplicationManager):
                  
                  # 3. If still no response found
                  elif not response_found:
-                    logger.warning(f"Agent '{agent_used_name}' responded successfully, but the returned Task object contained NO usable message in history, artifacts, or status.message (for INPUT_REQUIRED state). TaskId: {task_id}. Check agent logs if response was expected. Full Task Result: {task_result}")
+                    logger.warning("Agent '%s' responded successfully, but the returned Task object contained NO usable message in history, artifacts, or status.message (for INPUT_REQUIRED state). TaskId: %s. Check agent logs if response was expected. Full Task Result: %s", agent_used_name, task_id, task_result)
                     response_text = "Agent processed the request but returned no messages or artifacts."
                     response = Message(role="agent", parts=[TextPart(text=response_text)])
                     task.status.state = TaskState.COMPLETED
             else:
                 # Handle unexpected successful response structure (e.g., result is None)
-                logger.warning(f"Agent '{agent_used_name}' response structure unexpected (e.g., result is None). TaskId: {task_id}. Full JSON-RPC Response: {task_response}")
+                logger.warning("Agent '%s' response structure unexpected (e.g., result is None). TaskId: %s. Full JSON-RPC Response: %s", agent_used_name, task_id, task_response)
                 response_text = "Agent processed the request but did not return a valid result structure."
                 response = Message(role="agent", parts=[TextPart(text=response_text)])
                 task.status.state = TaskState.COMPLETED
@@ -265,31 +332,28 @@ class InMemoryFakeAgentManager(ApplicationManager):
         # --- End safe set ---
         task.status.error = JSONRPCError(code=-32603, message="Internal error: No response generated.")
 
-    response.metadata = {**message.metadata, **{'message_id': str(uuid.uuid4())}}
+    response.metadata = {**message.metadata, 'message_id': uuid.uuid4().hex}
     if conversation:
       conversation.messages.append(response)
     
     self._events.append(Event(
-        id=str(uuid.uuid4()),
+        id=uuid.uuid4().hex,
         actor="agent", # Changed actor to agent
         content=response,
-        timestamp=datetime.datetime.utcnow().timestamp(),
+        timestamp=time.time(),
     ))
     
-    self._pending_message_ids.remove(message.metadata['message_id'])
+    self._pending_message_ids.pop(message.metadata['message_id'], None)
     
     # Update task status (most states set above)
     task.history.append(response) # Add final response to history
     self.update_task(task)
 
   def add_task(self, task: Task):
-    self._tasks.append(task)
+    self._tasks[task.id] = task
 
   def update_task(self, task: Task):
-    for i, t in enumerate(self._tasks):
-      if t.id == task.id:
-        self._tasks[i] = task
-        return
+    self._tasks[task.id] = task
 
   def add_event(self, event: Event):
     self._events.append(event)
@@ -300,16 +364,14 @@ class InMemoryFakeAgentManager(ApplicationManager):
   ) -> Optional[Conversation]:
     if not conversation_id:
       return None
-    return next(
-        filter(lambda c: c.conversation_id == conversation_id,
-               self._conversations), None)
+    return self._conversations.get(conversation_id)
 
   def get_pending_messages(self) -> list[Tuple[str,str]]:
     rval = []
     for message_id in self._pending_message_ids:
-      if message_id in self._task_map:
-        task_id = self._task_map[message_id]
-        task = next(filter(lambda x: x.id == task_id, self._tasks), None)
+      task_id = self._task_map.get(message_id)
+      if task_id:
+        task = self._tasks.get(task_id)
         if not task:
           rval.append((message_id, ""))
         elif task.history and task.history[-1].parts:
@@ -322,28 +384,42 @@ class InMemoryFakeAgentManager(ApplicationManager):
                 part.text if part.type == "text" else "Working..."))
       else:
         rval.append((message_id, ""))
-      return rval
-    return self._pending_message_ids
+    return rval
 
-  def register_agent(self, url):
-    agent_data = get_agent_card(url)
+  async def register_agent(self, url):
+    agent_data = await get_agent_card(url)
     if not agent_data.url:
       agent_data.url = url
     self._agents.append(agent_data)
 
+  async def register_agents(self, urls: list[str]):
+    """Register several agents, fetching their cards concurrently.
+
+    Failed fetches are logged and skipped rather than aborting the batch.
+    """
+    cards = await asyncio.gather(
+        *(get_agent_card(url) for url in urls), return_exceptions=True)
+    for url, card in zip(urls, cards):
+      if isinstance(card, BaseException):
+        logger.error("Failed to register agent at %s: %s", url, card)
+        continue
+      if not card.url:
+        card.url = url
+      self._agents.append(card)
+
   @property
   def agents(self) -> list[AgentCard]:
     return self._agents
 
   @property
   def conversations(self) -> list[Conversation]:
-    return self._conversations
+    return list(self._conversations.values())
 
   @property
   def tasks(self) -> list[Task]:
-    return self._tasks
+    return list(self._tasks.values())
 
   @property
   def events(self) -> list[Event]:
-    return self._events
+    return list(self._events)
 
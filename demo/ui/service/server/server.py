@@ -104,7 +104,7 @@ class ConversationServer:
 
   async def _send_message(self, request: Request):
     message_data = await request.json()
-    logger.info(f"--- Received /message/send request. Payload: {message_data}") 
+    logger.info("--- Received /message/send request. Payload: %s", message_data)
     message = Message(**message_data['params'])
     message = self.manager.sanitize_message(message)
     
@@ -170,14 +170,14 @@ class ConversationServer:
   async def _register_agent(self, request: Request):
     message_data = await request.json()
     url = message_data['params']
-    self.manager.register_agent(url)
+    await self.manager.register_agent(url)
     return RegisterAgentResponse()
 
   async def _list_agents(self):
     logger.info("Received request to list agents.") # Log request start
     try:
       agents_list = self.manager.agents
-      logger.info(f"Agent list retrieved from manager: {agents_list}") # Log retrieved list
+      logger.info("Agent list retrieved from manager: %s", agents_list) # Log retrieved list
       # Ensure an iterable is returned, even if None was retrieved
       return ListAgentResponse(result=agents_list if agents_list is not None else [])
     except Exception as e:
@@ -1,17 +1,36 @@
-import requests
+import httpx
 import logging # Import logging
-from urllib.parse import urlparse # Import url tools
+import time
+from urllib.parse import urljoin # Import url tools
+from pydantic import TypeAdapter
 from common.types import AgentCard
 
 logger = logging.getLogger(__name__) # Get logger
 
-def get_agent_card(remote_agent_address: str) -> AgentCard:
+# Validator compiled once; AgentCard(**data) would rebuild it per call
+_CARD_ADAPTER = TypeAdapter(AgentCard)
+
+# Translation table that deletes all whitespace in one pass
+_WS_TABLE = str.maketrans("", "", " \t\n\r\f\v")
+
+# Cards fetched recently, keyed by cleaned address -> (expiry, card).
+# Re-registering the same agent (UI reconnect, hot reload) skips the
+# HTTP round-trip within the TTL; only successful fetches are cached.
+_CARD_CACHE: dict[str, tuple[float, AgentCard]] = {}
+_CARD_TTL_SECONDS = 300.0
+
+async def get_agent_card(remote_agent_address: str) -> AgentCard:
   """Get the agent card."""
   # Strip leading/trailing and remove internal whitespace
-  cleaned_address = "".join(remote_agent_address.split())
+  cleaned_address = remote_agent_address.translate(_WS_TABLE)
   logger.info(f"Original address: '{remote_agent_address}', Cleaned address: '{cleaned_address}'")
   remote_agent_address = cleaned_address # Use the cleaned address
 
+  cached = _CARD_CACHE.get(cleaned_address)
+  if cached and time.monotonic() < cached[0]:
+    logger.info(f"Returning cached agent card for '{cleaned_address}'")
+    return cached[1]
+
   # Simple scheme check and construction
   if not remote_agent_address.startswith(("http://", "https://")):
     base_url = f"http://{remote_agent_address}"
@@ -19,35 +38,35 @@ def get_agent_card(remote_agent_address: str) -> AgentCard:
   else:
     base_url = remote_agent_address
 
-  # Ensure trailing slash for joining
-  if not base_url.endswith('/'):
-    base_url += '/'
-  
-  agent_card_url = base_url + ".well-known/agent.json"
+  agent_card_url = urljoin(base_url.rstrip('/') + '/', ".well-known/agent.json")
   logger.info(f"Constructed agent card URL: {agent_card_url}")
 
   try:
-    response = requests.get(agent_card_url, timeout=10) # Increased timeout slightly
+    # Open a client per call: this is reached from several event loops
+    # (the uvicorn loop and asyncio.run in Mesop handlers), and pooled
+    # connections must not outlive the loop they were created on.
+    async with httpx.AsyncClient(timeout=10.0) as client:
+      response = await client.get(agent_card_url)
     response.raise_for_status() # Raise exception for bad status codes (4xx or 5xx)
-    
-    agent_card_data = response.json()
-    logger.info(f"Received agent card data: {agent_card_data}")
-    # Add validation before returning
-    card = AgentCard(**agent_card_data)
+
+    # Validate straight from the response bytes, skipping the intermediate dict
+    card = _CARD_ADAPTER.validate_json(response.content)
+    logger.info("Received agent card data: %s", card)
     # Store the original URL if not present in the card itself
     if not card.url:
       card.url = base_url.rstrip('/')
+    _CARD_CACHE[cleaned_address] = (time.monotonic() + _CARD_TTL_SECONDS, card)
     return card
-  except requests.exceptions.Timeout:
+  except httpx.TimeoutException:
     logger.error(f"Timeout fetching agent card from {agent_card_url}")
     raise ValueError(f"Timeout connecting to agent at {remote_agent_address}")
-  except requests.exceptions.RequestException as e:
+  except httpx.HTTPStatusError as e:
     logger.error(f"Error fetching agent card from {agent_card_url}: {e}", exc_info=True)
-    # Attempt to provide a more specific error message if possible
-    err_msg = str(e)
-    if response is not None:
-      err_msg = f"{response.status_code} {response.reason}"
+    err_msg = f"{e.response.status_code} {e.response.reason_phrase}"
     raise ValueError(f"Cannot connect to agent as {err_msg} ({remote_agent_address})") from e
+  except httpx.HTTPError as e:
+    logger.error(f"Error fetching agent card from {agent_card_url}: {e}", exc_info=True)
+    raise ValueError(f"Cannot connect to agent as {e} ({remote_agent_address})") from e
   except ValueError as e: # Catch JSON decoding errors specifically
     logger.error(f"Error decoding agent card JSON from {agent_card_url}: {e}", exc_info=True)
     raise ValueError(f"Could not parse agent card JSON from {remote_agent_address}") from e